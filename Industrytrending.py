@@ -1,50 +1,117 @@
 import os
+import contextlib
+import functools
 from datetime import datetime
 import pandas as pd
 import akshare as ak
-import time
+import threading
 import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+import ParallelUtils as utils
+
+try:
+    import numexpr as ne  # 可选依赖：安装后信号掩码单趟计算
+except ImportError:
+    ne = None
+
+try:
+    import pyarrow  # 可选依赖：安装后最终结果以 zstd 压缩的 parquet 缓存，否则回退 pickle
+    _RESULT_CACHE_EXT = 'parquet'
+except ImportError:
+    _RESULT_CACHE_EXT = 'pkl'
+
+# 并发抓取时限制同时在途的 akshare 请求数，代替逐个周期的固定 sleep
+_AK_SEMAPHORE = threading.Semaphore(3)
+
+
+@utils.retry_with_backoff(max_attempts=3, base_delay=0.5, max_delay=4.0)
+def _ak_request(fetch_func, **kwargs):
+    """限流调用 akshare 接口；失败时在信号量外退避重试，不占用并发名额"""
+    with _AK_SEMAPHORE:
+        return fetch_func(**kwargs)
+
+
+@contextlib.contextmanager
+def _shared_http_session(pool_size=10):
+    """
+    抓取期间让 requests.get/post 复用同一个 Session 的 keep-alive 连接池，省去每次请求的 TCP/TLS 握手。
+    akshare 未提供注入 Session 的接口，其同花顺接口内部直接调用 requests.get，因此临时替换 requests.api.request。
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    original_request = requests.api.request
+    requests.api.request = session.request
+    try:
+        yield session
+    finally:
+        requests.api.request = original_request
+        session.close()
+
+
+# 列清洗函数放在模块级而非绑定方法，整列向量化处理；
+# 如需在多核上加速 pandas 操作，可将上方 import 换成 `import modin.pandas as pd`，此处无需改动。
+def _normalize_amount(series):
+    """整列金额统一为亿元，无法解析的记为 0"""
+    s = series.astype(str).str.strip()
+    has_yi = s.str.contains('亿', regex=False)
+    has_wan = s.str.contains('万', regex=False)
+    base = pd.to_numeric(s.str.replace('[亿万]', '', regex=True), errors='coerce').fillna(0.0)
+    return pd.Series(np.where(has_wan & ~has_yi, base / 10000.0, base), index=series.index)
+
+
+def _clean_pct(series):
+    """整列百分比转数值，无法解析的记为 0"""
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float).fillna(0.0)
+    s = series.astype(str).str.replace('%', '', regex=False).str.strip()
+    return pd.to_numeric(s, errors='coerce').fillna(0.0)
+
 
 class IndustryFlowAnalyzer:
 
     def __init__(self, config):
         self.config = config
         self.today_str = datetime.now().strftime('%Y%m%d')
-        self.cache_filename = f"行业权重趋势_{self.today_str}.txt"
+        self.cache_filename = f"行业权重趋势_{self.today_str}.{_RESULT_CACHE_EXT}"
         self.cache_path = os.path.join(self.config.TEMP_DATA_DIRECTORY, self.cache_filename)
 
-    def _normalize_amount(self, val):
-        if pd.isna(val): return 0.0
-        s = str(val).strip()
-        try:
-            if '亿' in s: return float(s.replace('亿', ''))
-            elif '万' in s: return float(s.replace('万', '')) / 10000.0
-            else: return float(s)
-        except: return 0.0
-
-    def _clean_pct_string(self, val):
-        if pd.isna(val): return 0.0
-        if isinstance(val, (int, float)): return float(val)
-        try: return float(str(val).replace('%', '').strip())
-        except: return 0.0
-
-    def _fetch_and_clean(self, period_name):
-        """抓取同花顺行业资金流接口"""
+    def _ak_fetch(self, fetch_func, cache_name, **kwargs):
+        """调用 akshare 接口，原始结果按接口+日期缓存为 pickle，中途失败重跑时不再重复请求"""
+        file_path = os.path.join(self.config.TEMP_DATA_DIRECTORY, f"行业_{cache_name}_{self.today_str}.pkl")
+        if os.path.exists(file_path):
+            try:
+                return pd.read_pickle(file_path)
+            except Exception as e:
+                print(f"[WARN] 接口缓存 {os.path.basename(file_path)} 加载失败: {e}，将重新获取。")
+
+        df = _ak_request(fetch_func, **kwargs)
+
+        if df is not None and not df.empty:
+            try:
+                os.makedirs(self.config.TEMP_DATA_DIRECTORY, exist_ok=True)
+                df.to_pickle(file_path)
+            except Exception as e:
+                print(f"[WARN] 接口缓存 {os.path.basename(file_path)} 保存失败: {e}")
+        return df
+
+    def _fetch_and_clean(self, period_name, columns):
+        """抓取同花顺行业资金流接口，只保留 columns 指定的列以缩小后续对齐的数据量"""
         try:
-            df = ak.stock_fund_flow_industry(symbol=period_name)
+            df = self._ak_fetch(ak.stock_fund_flow_industry, f"资金流_{period_name}", symbol=period_name)
             if df is None or df.empty: return pd.DataFrame()
-            df = df.rename(columns={'行业': '行业名称'})
-            # 清洗百分比和金额
-            pct_cols = ['行业-涨跌幅', '阶段涨跌幅', '领涨股-涨跌幅']
-            for col in pct_cols:
-                if col in df.columns:
-                    df[col] = df[col].apply(self._clean_pct_string)
-            money_cols = ['流入资金', '流出资金', '净额']
-            for col in money_cols:
-                if col in df.columns:
-                    if df[col].dtype == 'object':
-                        df[col] = df[col].apply(self._normalize_amount)
-                    df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0.0)
+            df = df.rename(columns={'行业': '行业名称'})[columns].copy()
+            # 清洗百分比和金额 (先取出实际存在的列，再整块处理)
+            pct_cols = df.columns.intersection(['行业-涨跌幅', '阶段涨跌幅', '领涨股-涨跌幅'])
+            if len(pct_cols):
+                df[pct_cols] = df[pct_cols].apply(_clean_pct)
+            money_cols = df.columns.intersection(['流入资金', '流出资金', '净额'])
+            if len(money_cols):
+                # 非数值列 (object / pandas 的 string 类型) 才需要解析'亿'/'万'单位
+                df[money_cols] = df[money_cols].apply(
+                    lambda s: s.astype(float).fillna(0.0) if pd.api.types.is_numeric_dtype(s) else _normalize_amount(s))
             return df
         except Exception as e:
             print(f"[WARN] 周期 {period_name} 数据抓取失败: {e}")
@@ -53,7 +120,7 @@ class IndustryFlowAnalyzer:
     def _fetch_market_turnover(self):
         """抓取东方财富行业接口以补全【换手率】"""
         try:
-            df = ak.stock_board_industry_name_em()
+            df = self._ak_fetch(ak.stock_board_industry_name_em, "板块换手率")
             # 统一列名以备 merge
             df = df[['板块名称', '换手率']]
             df.columns = ['行业名称', '换手率']
@@ -65,70 +132,117 @@ class IndustryFlowAnalyzer:
     def _fetch_big_deal_logic(self):
         """抓取大单追踪以增强潜入识别"""
         try:
-            df = ak.stock_fund_flow_big_deal()
-            if df.empty: return set()
+            df = self._ak_fetch(ak.stock_fund_flow_big_deal, "大单追踪")
+            if df.empty: return frozenset()
             # 只统计买入的大单
-            buy_stocks = set(df[df['大单性质'].str.contains('买入', na=False)]['股票简称'].tolist())
+            mask = df['大单性质'].str.contains('买入', na=False).to_numpy()
+            buy_stocks = frozenset(df['股票简称'].to_numpy()[mask])
             return buy_stocks
         except:
-            return set()
+            return frozenset()
 
     def run_analysis(self) -> pd.DataFrame:
         if os.path.exists(self.cache_path):
             print(f">>> 发现本地缓存：{self.cache_filename}，正在加载...")
             try:
-                return pd.read_csv(self.cache_path, sep='\t', encoding='utf-8')
+                if _RESULT_CACHE_EXT == 'parquet':
+                    return pd.read_parquet(self.cache_path)
+                return pd.read_pickle(self.cache_path)
             except Exception as e:
                 print(f"[WARN] 缓存加载失败: {e}")
 
         print(f"\n>>> 开始从接口获取行业趋势及筹码分布...")
         period_map = {"即时": "now", "3日排行": "3d", "5日排行": "5d", "10日排行": "10d", "20日排行": "20d"}
-        dfs = {}
-        for p_name, p_key in period_map.items():
-            df = self._fetch_and_clean(p_name)
-            if not df.empty: dfs[p_key] = df
-            time.sleep(1.0)
+        # 五个周期 + 换手率 + 大单追踪共用一个线程池并发抓取
+        # 即时周期提供主表字段，其余周期只需净额和阶段涨跌幅
+        now_cols = ['行业名称', '行业指数', '行业-涨跌幅', '净额', '流入资金', '领涨股', '领涨股-涨跌幅']
+        period_cols = ['行业名称', '净额', '阶段涨跌幅']
+        fetchers = {p_key: functools.partial(self._fetch_and_clean, p_name, now_cols if p_key == 'now' else period_cols)
+                    for p_name, p_key in period_map.items()}
+        fetchers['turnover'] = self._fetch_market_turnover
+        fetchers['big_deal'] = self._fetch_big_deal_logic
+        with _shared_http_session():
+            fetched = dict(utils.run_with_thread_pool(
+                items=list(fetchers),
+                worker_func=lambda key: (key, fetchers[key]()),
+                max_workers=len(fetchers),
+                desc="行业周期抓取"
+            ))
+        dfs = {p_key: fetched[p_key] for p_key in period_map.values()
+               if p_key in fetched and not fetched[p_key].empty}
 
         if "now" not in dfs: return pd.DataFrame()
 
-        # 1. 基础资金数据对齐
-        main = dfs['now'][['行业名称', '行业指数', '行业-涨跌幅', '净额', '流入资金', '领涨股', '领涨股-涨跌幅']].copy()
+        # 1. 基础资金数据对齐：所有表的行业名称一次性 factorize 成 int64 编码，
+        #    按编码索引对齐后一次 concat 完成全部左连接
+        turnover_df = fetched.get('turnover', pd.DataFrame())
+        keyed = dict(dfs)
+        if not turnover_df.empty:
+            keyed['turnover'] = turnover_df
+        codes, uniques = pd.factorize(pd.concat([df['行业名称'] for df in keyed.values()], ignore_index=True))
+        bounds = np.cumsum([0] + [len(df) for df in keyed.values()])
+        ind_codes = {key: codes[start:end] for key, start, end in zip(keyed, bounds[:-1], bounds[1:])}
+
+        main = dfs['now'][now_cols[1:]].set_axis(ind_codes['now'])
         main.rename(columns={'净额': '净额_now', '行业-涨跌幅': '涨幅_now'}, inplace=True)
 
-        for p in ['3d', '5d', '10d', '20d']:
-            if p in dfs:
-                tmp = dfs[p][['行业名称', '净额', '阶段涨跌幅']]
-                tmp.columns = ['行业名称', f'净额_{p}', f'涨幅_{p}']
-                main = pd.merge(main, tmp, on='行业名称', how='left')
+        def _aligned(key, cols, new_cols):
+            tmp = keyed[key][cols].set_axis(ind_codes[key])
+            tmp = tmp[~tmp.index.duplicated()]
+            tmp.columns = new_cols
+            return tmp.reindex(main.index)
+
+        slices = [_aligned(p, ['净额', '阶段涨跌幅'], [f'净额_{p}', f'涨幅_{p}'])
+                  for p in ['3d', '5d', '10d', '20d'] if p in dfs]
 
         # 2. 补全缺失的【换手率】和【大单】维度
-        turnover_df = self._fetch_market_turnover()
-        if not turnover_df.empty:
-            main = pd.merge(main, turnover_df, on='行业名称', how='left')
-        else:
+        if 'turnover' in keyed:
+            slices.append(_aligned('turnover', ['换手率'], ['换手率']))
+
+        main = pd.concat([main] + slices, axis=1)
+        main.insert(0, '行业名称', uniques.take(main.index, fill_value=np.nan))
+        main.reset_index(drop=True, inplace=True)
+        if turnover_df.empty:
             main['换手率'] = 0.0 # 兜底逻辑
 
-        big_deal_stocks = self._fetch_big_deal_logic()
-        main['大单印证'] = main['领涨股'].apply(lambda x: '确认' if x in big_deal_stocks else '无')
+        big_deal_stocks = fetched.get('big_deal', frozenset())
+        main['大单印证'] = np.where(main['领涨股'].isin(big_deal_stocks), '确认', '无')
 
         # 3. 核心计算 (处理缺失值)
         money_rank_cols = ['净额_3d', '净额_5d', '净额_10d', '净额_20d']
         for col in money_rank_cols: main[col] = main[col].fillna(0.0)
         
-        main['资金分'] = (main['净额_3d'] * 0.4 + main['净额_5d'] * 0.3 + main['净额_10d'] * 0.2 + main['净额_20d'] * 0.1).rank(pct=True) * 100
-        main['价格分'] = (main['涨幅_now'].rank(pct=True) * 100) # 以即时强度为主
-        main['换手分'] = main['换手率'].rank(pct=True, ascending=False) * 100 # 换手越低（缩量）得分越高
-        main['趋势得分'] = (main['资金分'] * 0.5 + main['价格分'] * 0.5).round(2)
+        # 三个分项在同一个二维块上一次 rank；换手率取负号，等价于 ascending=False（换手越低/缩量得分越高）
+        rank_src = pd.DataFrame({
+            '资金分': main['净额_3d'] * 0.4 + main['净额_5d'] * 0.3 + main['净额_10d'] * 0.2 + main['净额_20d'] * 0.1,
+            '价格分': main['涨幅_now'],  # 以即时强度为主
+            '换手分': -main['换手率'],
+        })
+        ranks = rank_src.rank(pct=True) * 100
+        main[['资金分', '价格分', '换手分']] = ranks
+        zj = main['资金分'].to_numpy(dtype=np.float64)
+        jg = main['价格分'].to_numpy(dtype=np.float64)
+        # 趋势得分 = round(0.5 * (资金分 + 价格分), 2)，在同一块 float64 缓冲区上原地计算
+        ts = np.add(zj, jg)
+        np.multiply(ts, 0.5, out=ts)
+        np.round(ts, 2, out=ts)
+        main['趋势得分'] = ts
 
-        # 4. 潜入识别信号逻辑
-        # 黄金坑：钱在进（资金分>75），价没起（价格分<50），散户没动（换手分>60, 即低换手率）
-        is_submerged = (main['资金分'] > 75) & (main['价格分'] < 50) & (main['换手分'] > 60)
-        # 异动点：价格开始抬头，且有大单背书
-        is_shaking = (main['趋势得分'].between(50, 80)) & (main['大单印证'] == '确认')
+        # 4. 潜入识别信号逻辑 (直接在 ndarray 上计算布尔掩码)
+        hs = main['换手分'].to_numpy(dtype=np.float64)
+        dy = main['大单印证'].values == '确认'
+        if ne is not None:
+            # 黄金坑：钱在进（资金分>75），价没起（价格分<50），散户没动（换手分>60, 即低换手率）
+            is_submerged = ne.evaluate('(zj > 75) & (jg < 50) & (hs > 60)')
+            # 异动点：价格开始抬头，且有大单背书
+            is_shaking = ne.evaluate('(ts >= 50) & (ts <= 80) & dy')
+        else:
+            is_submerged = (zj > 75) & (jg < 50) & (hs > 60)
+            is_shaking = (ts >= 50) & (ts <= 80) & dy
 
         conds = [
-            (main['趋势得分'] > 85),
-            (main['趋势得分'] < 25),
+            (ts > 85),
+            (ts < 25),
             (is_submerged),
             (is_shaking)
         ]
@@ -138,7 +252,10 @@ class IndustryFlowAnalyzer:
 
         try:
             if not os.path.exists(self.config.TEMP_DATA_DIRECTORY): os.makedirs(self.config.TEMP_DATA_DIRECTORY)
-            result.to_csv(self.cache_path, sep='\t', index=False, encoding='utf-8')
+            if _RESULT_CACHE_EXT == 'parquet':
+                result.to_parquet(self.cache_path, index=False, compression='zstd')
+            else:
+                result.to_pickle(self.cache_path)
             print(f">>> 深度分析完成，结果存至: {self.cache_filename}")
         except Exception as e:
             print(f"[WARN] 保存失败: {e}")
@@ -1,7 +1,108 @@
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 from typing import Callable, Iterable, List, Any
+import functools
 import time
-import pd
+import numpy as np
+import pandas as pd
+
+try:
+    from numba import njit, prange  # 可选依赖：安装后资金列解析走 JIT 内核
+except ImportError:
+    njit = None
+
+_YI = 0x4EBF   # '亿'
+_WAN = 0x4E07  # '万'
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _parse_float(row, start, end):
+        """解析码点区间 [start, end) 表示的十进制数，格式不合法时返回 nan。"""
+        j = start
+        sign = 1.0
+        if j < end and (row[j] == 45 or row[j] == 43):  # '-' / '+'
+            if row[j] == 45:
+                sign = -1.0
+            j += 1
+        mantissa = 0.0
+        n_digits = 0
+        scale = 0
+        while j < end and 48 <= row[j] <= 57:
+            mantissa = mantissa * 10.0 + (row[j] - 48)
+            n_digits += 1
+            j += 1
+        if j < end and row[j] == 46:  # '.'
+            j += 1
+            while j < end and 48 <= row[j] <= 57:
+                mantissa = mantissa * 10.0 + (row[j] - 48)
+                n_digits += 1
+                scale += 1
+                j += 1
+        if n_digits == 0:
+            return np.nan
+        if j < end and (row[j] == 101 or row[j] == 69):  # 'e' / 'E'
+            j += 1
+            exp_sign = 1
+            if j < end and (row[j] == 45 or row[j] == 43):
+                if row[j] == 45:
+                    exp_sign = -1
+                j += 1
+            exp = 0
+            exp_digits = 0
+            while j < end and 48 <= row[j] <= 57:
+                exp = exp * 10 + (row[j] - 48)
+                exp_digits += 1
+                j += 1
+            if exp_digits == 0:
+                return np.nan
+            scale -= exp_sign * exp
+        if j != end:
+            return np.nan
+        if scale > 0:
+            return sign * mantissa / 10.0 ** scale
+        return sign * mantissa * 10.0 ** (-scale)
+
+    @njit(parallel=True, cache=True)
+    def _parse_amount_col(codepoints, out):
+        """
+        按行并行解析 UTF-32 码点矩阵 (每行一个单元格，尾部以 0 填充)，结果写入 out (单位：万元)。
+        末尾为'亿'的乘 10000，为'万'的去掉单位，无法解析的记为 0。
+        """
+        n_rows, width = codepoints.shape
+        for i in prange(n_rows):
+            row = codepoints[i]
+            start = 0
+            end = width
+            while end > start and (row[end - 1] == 0 or row[end - 1] == 32 or 9 <= row[end - 1] <= 13):
+                end -= 1
+            while start < end and (row[start] == 32 or 9 <= row[start] <= 13):
+                start += 1
+            unit = 1.0
+            if end > start and row[end - 1] == _YI:
+                unit = 10000.0
+                end -= 1
+            elif end > start and row[end - 1] == _WAN:
+                end -= 1
+            val = _parse_float(row, start, end)
+            out[i] = 0.0 if np.isnan(val) else val * unit
+else:
+    _parse_amount_col = None
+
+
+def _convert_to_wan(series):
+    """将一列带'亿'/'万'单位的字符串转换为万元数值，'-'/空值/无法解析的记为 0。"""
+    if _parse_amount_col is not None:
+        # 一次性转成定长 UTF-32 数组，按码点矩阵交给 JIT 内核，避免中间字符串数组
+        values = np.asarray(series.astype(str).to_numpy(), dtype=str)
+        codepoints = values.view(np.uint32).reshape(len(values), -1)
+        out = np.empty(len(values), dtype=np.float64)
+        _parse_amount_col(codepoints, out)
+        return out
+
+    s = series.astype(str).str.strip()
+    has_yi = s.str.contains('亿', regex=False)
+    base = pd.to_numeric(s.str.replace('[亿万]', '', regex=True), errors='coerce').fillna(0.0)
+    return np.where(has_yi, base * 10000, base)
 
 
 def _normalize_fund_data(df):
@@ -11,26 +112,13 @@ def _normalize_fund_data(df):
     if df is None or df.empty:
         return df
 
-    # 定义关键词，自动识别需要转换单位的列
+    # 定义关键词，自动识别需要转换单位的列；已是数值型的列直接跳过，仅处理字符串类型
     zijin_keywords = ['资金', '流向', '净流入', '净额', '成交额']
-    target_cols = [col for col in df.columns if any(k in col for k in zijin_keywords)]
+    object_cols = df.select_dtypes(include=[object, 'string']).columns
+    target_cols = [col for col in object_cols if any(k in col for k in zijin_keywords)]
 
     for col in target_cols:
-        if df[col].dtype == object:  # 仅处理字符串类型
-            def convert_to_wan(val):
-                if val is None or str(val).strip() in ['', '-']:
-                    return 0.0
-                val_str = str(val).strip()
-                try:
-                    if '亿' in val_str:
-                        return float(val_str.replace('亿', '')) * 10000
-                    elif '万' in val_str:
-                        return float(val_str.replace('万', ''))
-                    else:
-                        return float(val_str)
-                except:
-                    return 0.0
-            df[col] = df[col].apply(convert_to_wan)
+        df[col] = _convert_to_wan(df[col])
     return df
 
 
@@ -47,27 +135,53 @@ def run_with_thread_pool(
     :param worker_func: 处理单个数据的函数 (输入一个item，返回结果)
     :param max_workers: 最大线程数
     :param desc: 任务描述，用于日志打印
-    :return: 包含所有成功结果的列表 (过滤掉 None)
+    :return: 包含所有成功结果的列表 (过滤掉 None)，顺序与 items 一致
     """
-    results = []
-    total = len(list(items))  # 注意：如果items是生成器，这里会消耗掉，建议传list
+    items = list(items)  # 统一物化一次，生成器不会在计数时被提前耗尽
+    total = len(items)
 
     print(f"\n>>> 开始并发执行: {desc} (数量: {total}, 线程: {max_workers})...")
 
+    def safe_worker(item):
+        # 异常在 worker 内部消化，避免中断 executor.map 的结果迭代
+        try:
+            return worker_func(item)
+        except Exception as e:
+            print(f"[ERROR] 处理 {item} 时发生异常: {e}")
+            return None
+
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # 提交任务
-        future_to_item = {executor.submit(worker_func, item): item for item in items}
-
-        for future in as_completed(future_to_item):
-            item = future_to_item[future]
-            try:
-                res = future.result()
-                if res is not None:
-                    # 如果结果是 DataFrame 且为空，视具体情况决定是否添加
-                    # 这里只要不是 None 就添加，由调用方后续处理 (如 concat)
-                    results.append(res)
-            except Exception as e:
-                print(f"[ERROR] 处理 {item} 时发生异常: {e}")
+        # 结果按 items 顺序返回；只要不是 None 就添加，由调用方后续处理 (如 concat)
+        results = [res for res in executor.map(safe_worker, items) if res is not None]
 
     print(f">>> {desc} 执行完毕，成功获取 {len(results)} 条结果。")
     return results
+
+
+def retry_with_backoff(
+        max_attempts: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 4.0
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    重试装饰器：仅在调用抛出异常时按指数退避等待后重试，成功时不做任何等待。
+
+    :param max_attempts: 最大尝试次数 (含首次调用)
+    :param base_delay: 首次重试前的等待秒数，之后每次翻倍
+    :param max_delay: 单次等待的上限秒数
+    :return: 装饰器；最后一次仍失败时原样抛出异常
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            for attempt in range(1, max_attempts + 1):
+                try:
+                    return func(*args, **kwargs)
+                except Exception as e:
+                    if attempt == max_attempts:
+                        raise
+                    delay = min(base_delay * 2 ** (attempt - 1), max_delay)
+                    print(f"[WARN] {func.__name__} 第 {attempt}/{max_attempts} 次调用失败: {e}，{delay:.1f} 秒后重试。")
+                    time.sleep(delay)
+        return wrapper
+    return decorator
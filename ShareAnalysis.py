@@ -3,6 +3,7 @@ import pandas as pd
 from datetime import datetime, timedelta
 import time
 import os
+import json
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Callable, Dict, Any, List
 import numpy as np
@@ -58,13 +59,28 @@ class StockAnalyzer:
         file_name = f"{base_name}{suffix}_{self.today_str}.txt"
         return os.path.join(self.temp_dir, file_name)
 
+    def _get_schema_path(self, file_path: str) -> str:
+        """缓存文件对应的列类型描述文件路径。"""
+        return os.path.splitext(file_path)[0] + '.schema.json'
+
     def _load_data_from_cache(self, file_path: str) -> pd.DataFrame:
         """从缓存加载数据。"""
         if os.path.exists(file_path):
             try:
+                # 有列类型描述时按其指定 dtype 读取，跳过 pandas 的类型推断
+                dtype, parse_dates = {}, []
+                schema_path = self._get_schema_path(file_path)
+                if os.path.exists(schema_path):
+                    with open(schema_path, 'r', encoding='utf-8') as f:
+                        for col, col_type in json.load(f).items():
+                            if col_type.startswith('datetime'):
+                                parse_dates.append(col)
+                            else:
+                                dtype[col] = col_type
                 # 使用 '|'
                 # 分隔符，并确保股票代码是字符串格式
-                df = pd.read_csv(file_path, sep='|', encoding='utf-8', dtype={'股票代码': str})
+                dtype['股票代码'] = str
+                df = pd.read_csv(file_path, sep='|', encoding='utf-8', dtype=dtype, parse_dates=parse_dates)
                 print(f"  - 发现缓存，加载: {os.path.basename(file_path)}")
                 return df
             except Exception as e:
@@ -72,9 +88,11 @@ class StockAnalyzer:
         return pd.DataFrame()
 
     def _save_data_to_cache(self, df: pd.DataFrame, file_path: str):
-        """保存数据到缓存。"""
+        """保存数据到缓存，同时写入列类型描述供下次加载使用。"""
         try:
             df.to_csv(file_path, sep='|', index=False, encoding='utf-8')
+            with open(self._get_schema_path(file_path), 'w', encoding='utf-8') as f:
+                json.dump({str(col): str(dtype) for col, dtype in df.dtypes.items()}, f, ensure_ascii=False)
         except Exception as e:
             print(f"[ERROR] 保存数据到缓存 {os.path.basename(file_path)} 失败: {e}")
 